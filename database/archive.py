@@ -0,0 +1,362 @@
+# database/archive.py
+
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from database.db_handler import get_connection
+
+
+# ============ CONFIG ============
+ARCHIVE_DIR = "database/archive"   # one attendance_YYYY_MM.db (or .parquet) per closed month
+BATCH_SIZE = 500                   # rows moved per transaction
+BATCH_PAUSE = 0.05                 # seconds between batches so live gates can write
+BUSY_TIMEOUT_MS = 5000
+# ================================
+
+# table -> timestamp column used to assign rows to a month
+ARCHIVED_TABLES = {
+    "attendance": "timestamp",
+    "notifications": "sent_at",
+}
+
+ARCHIVE_SCHEMA = {
+    "attendance": '''CREATE TABLE IF NOT EXISTS {db}.attendance (
+                        id INTEGER PRIMARY KEY,
+                        student_id TEXT,
+                        name TEXT,
+                        status TEXT,
+                        timestamp TIMESTAMP
+                      )''',
+    "notifications": '''CREATE TABLE IF NOT EXISTS {db}.notifications (
+                        id INTEGER PRIMARY KEY,
+                        student_id TEXT,
+                        message TEXT,
+                        sent_at TIMESTAMP
+                      )''',
+}
+
+
+def month_bounds(month: str):
+    """
+    Return ('YYYY-MM-01', first day of next month) for a 'YYYY-MM' string.
+    """
+    year, mon = (int(part) for part in month.split("-"))
+    start = date(year, mon, 1)
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def archive_path(month: str, ext: str = "db", table: str = "attendance"):
+    """
+    Return the archive file path for a 'YYYY-MM' month.
+    """
+    return os.path.join(ARCHIVE_DIR, f"{table}_{month.replace('-', '_')}.{ext}")
+
+
+def _connect():
+    conn = get_connection()
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def closed_months(today: date = None):
+    """
+    Return the 'YYYY-MM' months before the current one that still have rows in the hot DB.
+    """
+    cutoff = (today or date.today()).replace(day=1).isoformat()
+    conn = _connect()
+    cursor = conn.cursor()
+
+    months = set()
+    for table, column in ARCHIVED_TABLES.items():
+        cursor.execute(f"SELECT DISTINCT substr({column}, 1, 7) FROM {table} WHERE {column} < ?", (cutoff,))
+        months.update(row[0] for row in cursor.fetchall() if row[0])
+
+    conn.close()
+    return sorted(months)
+
+
+def _rollup_batch(cursor, month: str, ids: list):
+    """Fold a batch of attendance rows into attendance_monthly_summary."""
+    placeholders = ",".join("?" * len(ids))
+    cursor.execute(f'''INSERT INTO attendance_monthly_summary
+                           (month, student_id, name, logins, logouts, events, first_seen, last_seen)
+                       SELECT ?, student_id, MAX(name),
+                              SUM(status = 'login'), SUM(status = 'logout'), COUNT(*),
+                              MIN(timestamp), MAX(timestamp)
+                       FROM main.attendance WHERE id IN ({placeholders})
+                       GROUP BY student_id
+                       ON CONFLICT(month, student_id) DO UPDATE SET
+                           name = excluded.name,
+                           logins = logins + excluded.logins,
+                           logouts = logouts + excluded.logouts,
+                           events = events + excluded.events,
+                           first_seen = MIN(first_seen, excluded.first_seen),
+                           last_seen = MAX(last_seen, excluded.last_seen)''',
+                   [month] + ids)
+
+
+def archive_month(month: str, batch_size: int = BATCH_SIZE, pause: float = BATCH_PAUSE):
+    """
+    Move one month of attendance and notification rows into its archive database.
+
+    Rows are copied and deleted in small transactions (with a pause between
+    them) so gates writing to the hot DB are never blocked for long. The copy
+    uses INSERT OR IGNORE on the original id, so an interrupted run can simply
+    be repeated.
+
+    Returns:
+        dict {table: rows moved}
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    start, end = month_bounds(month)
+    moved = {table: 0 for table in ARCHIVED_TABLES}
+
+    conn = _connect()
+    conn.isolation_level = None  # explicit transactions below
+    cursor = conn.cursor()
+    cursor.execute("ATTACH DATABASE ? AS arch", (archive_path(month),))
+    for table in ARCHIVED_TABLES:
+        cursor.execute(ARCHIVE_SCHEMA[table].format(db="arch"))
+
+    try:
+        for table, column in ARCHIVED_TABLES.items():
+            columns = "id, student_id, name, status, timestamp" if table == "attendance" \
+                else "id, student_id, message, sent_at"
+            while True:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(f"SELECT id FROM main.{table} WHERE {column} >= ? AND {column} < ? "
+                               f"ORDER BY id LIMIT ?", (start, end, batch_size))
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    cursor.execute("COMMIT")
+                    break
+
+                placeholders = ",".join("?" * len(ids))
+                cursor.execute(f"INSERT OR IGNORE INTO arch.{table} ({columns}) "
+                               f"SELECT {columns} FROM main.{table} WHERE id IN ({placeholders})", ids)
+                if table == "attendance":
+                    _rollup_batch(cursor, month, ids)
+                cursor.execute(f"DELETE FROM main.{table} WHERE id IN ({placeholders})", ids)
+                cursor.execute("COMMIT")
+
+                moved[table] += len(ids)
+                time.sleep(pause)
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.execute("DETACH DATABASE arch")
+        conn.close()
+
+    print(f"[INFO] Archived {month}: {moved}")
+    return moved
+
+
+def archive_closed_months(batch_size: int = BATCH_SIZE, pause: float = BATCH_PAUSE, to_parquet: bool = False):
+    """
+    Archive every closed month still in the hot DB.
+
+    Args:
+        batch_size (int): Rows moved per transaction
+        pause (float): Seconds to sleep between batches
+        to_parquet (bool): Also convert each month's archive to compressed Parquet
+    """
+    results = {}
+    for month in closed_months():
+        results[month] = archive_month(month, batch_size, pause)
+        if to_parquet:
+            export_month_to_parquet(month)
+    return results
+
+
+def export_month_to_parquet(month: str, compression: str = "zstd", remove_db: bool = True):
+    """
+    Convert a month's SQLite archive into compressed Parquet files
+    (attendance_YYYY_MM.parquet and notifications_YYYY_MM.parquet).
+
+    If the month was already exported (e.g. late rows were archived again),
+    the new rows are merged into the existing Parquet file, de-duplicated on id.
+    Each file is written to a temporary path and swapped in, so an interrupted
+    export never leaves a truncated archive.
+
+    Requires pandas with pyarrow (or fastparquet) installed.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        print("[ERROR] pandas is required for Parquet export")
+        return None
+
+    db_file = archive_path(month)
+    if not os.path.exists(db_file):
+        print(f"[INFO] No SQLite archive for {month}")
+        return None
+
+    conn = sqlite3.connect(db_file)
+    try:
+        paths = []
+        for table in ARCHIVED_TABLES:
+            df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+            path = archive_path(month, "parquet", table)
+            if os.path.exists(path):
+                df = pd.concat([pd.read_parquet(path), df], ignore_index=True)
+                df = df.drop_duplicates(subset="id", keep="last").sort_values("id")
+            tmp_path = path + ".tmp"
+            df.to_parquet(tmp_path, compression=compression, index=False)
+            os.replace(tmp_path, path)
+            paths.append(path)
+    except ImportError as e:
+        print(f"[ERROR] Parquet export needs pyarrow or fastparquet: {e}")
+        return None
+    finally:
+        conn.close()
+
+    if remove_db:
+        os.remove(db_file)
+    print(f"[INFO] Exported {month} archive to Parquet")
+    return paths
+
+
+def _months_between(start: date, end: date):
+    months = []
+    year, mon = start.year, start.month
+    while (year, mon) <= (end.year, end.month):
+        months.append(f"{year:04d}-{mon:02d}")
+        year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return months
+
+
+def _archived_months():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    months = set()
+    for filename in os.listdir(ARCHIVE_DIR):
+        if filename.startswith("attendance_") and filename.endswith((".db", ".parquet")):
+            stem = filename[len("attendance_"):].rsplit(".", 1)[0]
+            months.add(stem.replace("_", "-"))
+    return sorted(months)
+
+
+def get_attendance_range(start: date = None, end: date = None):
+    """
+    Return attendance logs (student_id, name, status, timestamp) between start and
+    end inclusive, reading the hot DB and any archived months in the range.
+    Either bound may be None for an open range.
+    """
+    lo = start.isoformat() if start else "0000-01-01"
+    hi = (end + timedelta(days=1)).isoformat() if end else "9999-12-31"
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT student_id, name, status, timestamp FROM attendance "
+                   "WHERE timestamp >= ? AND timestamp < ?", (lo, hi))
+    rows = cursor.fetchall()
+    conn.close()
+
+    months = _archived_months()
+    if start or end:
+        wanted = set(_months_between(start or date(1970, 1, 1), end or date.today()))
+        months = [m for m in months if m in wanted]
+
+    for month in months:
+        # A month can have both a Parquet export and a newer SQLite archive (late rows
+        # archived after the export), so read both and de-duplicate on the original id.
+        month_rows = {}
+        parquet_file = archive_path(month, "parquet")
+        if os.path.exists(parquet_file):
+            import pandas as pd
+            df = pd.read_parquet(parquet_file, columns=["id", "student_id", "name", "status", "timestamp"])
+            df = df[(df["timestamp"].astype(str) >= lo) & (df["timestamp"].astype(str) < hi)]
+            for row in df.itertuples(index=False, name=None):
+                month_rows[row[0]] = row[1:]
+        db_file = archive_path(month)
+        if os.path.exists(db_file):
+            arch = sqlite3.connect(db_file)
+            for row in arch.execute("SELECT id, student_id, name, status, timestamp FROM attendance "
+                                    "WHERE timestamp >= ? AND timestamp < ?", (lo, hi)):
+                month_rows[row[0]] = row[1:]
+            arch.close()
+        rows.extend(month_rows.values())
+
+    rows.sort(key=lambda row: str(row[3]))
+    return rows
+
+
+def get_monthly_summary(month: str = None):
+    """
+    Return rollup rows (month, student_id, name, logins, logouts, events, first_seen, last_seen)
+    for archived months, optionally for a single 'YYYY-MM' month.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    query = "SELECT month, student_id, name, logins, logouts, events, first_seen, last_seen " \
+            "FROM attendance_monthly_summary"
+    if month:
+        cursor.execute(query + " WHERE month = ? ORDER BY student_id", (month,))
+    else:
+        cursor.execute(query + " ORDER BY month, student_id")
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def incremental_vacuum_enabled():
+    """Return True if the hot DB uses incremental auto-vacuum."""
+    conn = _connect()
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    conn.close()
+    return mode == 2  # 2 = INCREMENTAL
+
+
+def enable_incremental_vacuum():
+    """
+    Switch the hot DB to incremental auto-vacuum. Needs one full VACUUM, so run
+    it once during a quiet period; afterwards compact_database() works online.
+    """
+    conn = _connect()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    conn.close()
+    print("[INFO] Incremental auto-vacuum enabled")
+
+
+def compact_database(pages_per_step: int = 200, pause: float = BATCH_PAUSE):
+    """
+    Return free pages left behind by archiving to the filesystem, a few at a time.
+
+    Returns:
+        Number of free pages reclaimed.
+    """
+    if not incremental_vacuum_enabled():
+        print("[INFO] Incremental auto-vacuum is off; run enable_incremental_vacuum() once first")
+        return 0
+
+    conn = _connect()
+    reclaimed = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free == 0:
+            break
+        # executescript steps the pragma to completion; execute() would free only one page
+        conn.executescript(f"PRAGMA incremental_vacuum({min(free, pages_per_step)});")
+        freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if freed <= 0:
+            break
+        reclaimed += freed
+        time.sleep(pause)
+    conn.close()
+
+    print(f"[INFO] Reclaimed {reclaimed} free pages")
+    return reclaimed
+
+
+# Example usage
+if __name__ == "__main__":
+    print("[INFO] Closed months in hot DB:", closed_months())
+    archive_closed_months()
+    compact_database()
+    print(f"[INFO] Rows this year: {len(get_attendance_range(date(datetime.now().year, 1, 1), date.today()))}")
@@ -1,5 +1,5 @@
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
 DB_PATH = "database/attendance.db"
@@ -15,6 +15,10 @@ def init_db():
     conn = get_connection()
     cursor = conn.cursor()
 
+    # Let archiving return freed pages to the filesystem (only takes effect on a new, empty DB;
+    # existing DBs are migrated once via database.archive.enable_incremental_vacuum)
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     # Students table
     cursor.execute('''CREATE TABLE IF NOT EXISTS students (
                         student_id TEXT PRIMARY KEY,
@@ -43,16 +47,78 @@ def init_db():
                         FOREIGN KEY (student_id) REFERENCES students(student_id)
                       )''')
 
+    # Monthly rollups kept in the hot DB after raw rows are archived
+    cursor.execute('''CREATE TABLE IF NOT EXISTS attendance_monthly_summary (
+                        month TEXT,
+                        student_id TEXT,
+                        name TEXT,
+                        logins INTEGER DEFAULT 0,
+                        logouts INTEGER DEFAULT 0,
+                        events INTEGER DEFAULT 0,
+                        first_seen TIMESTAMP,
+                        last_seen TIMESTAMP,
+                        PRIMARY KEY (month, student_id)
+                      )''')
+
+    # Range scans by time (reports and archiving)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_sent_at ON notifications(sent_at)")
+
+    # Student directory: keyset pagination by name, optionally within a course
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students(name, student_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_course ON students(course, name, student_id)")
+    init_student_search(cursor)
+
     conn.commit()
     conn.close()
 
 
+def init_student_search(cursor):
+    """
+    Create the FTS5 index over students (name, email, course) and its sync triggers.
+    Returns False if this SQLite build has no FTS5 (search then falls back to LIKE).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'students_fts'")
+    if cursor.fetchone():
+        return True
+
+    try:
+        cursor.execute('''CREATE VIRTUAL TABLE students_fts USING fts5(
+                            name, email, course,
+                            content='students', content_rowid='rowid'
+                          )''')
+    except sqlite3.OperationalError as e:
+        print(f"[INFO] FTS5 unavailable, student search will use LIKE: {e}")
+        return False
+
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+                        INSERT INTO students_fts(rowid, name, email, course)
+                        VALUES (new.rowid, new.name, new.email, new.course);
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+                        INSERT INTO students_fts(students_fts, rowid, name, email, course)
+                        VALUES ('delete', old.rowid, old.name, old.email, old.course);
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE ON students BEGIN
+                        INSERT INTO students_fts(students_fts, rowid, name, email, course)
+                        VALUES ('delete', old.rowid, old.name, old.email, old.course);
+                        INSERT INTO students_fts(rowid, name, email, course)
+                        VALUES (new.rowid, new.name, new.email, new.course);
+                      END''')
+    # Index students registered before the FTS table existed
+    cursor.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+    return True
+
+
 def add_student(student_id, name, email, course):
     """Add a new student into the database."""
     conn = get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("INSERT OR REPLACE INTO students (student_id, name, email, course) VALUES (?, ?, ?, ?)",
+    # Upsert rather than INSERT OR REPLACE so the row keeps its rowid and the FTS update trigger fires
+    cursor.execute("""INSERT INTO students (student_id, name, email, course) VALUES (?, ?, ?, ?)
+                      ON CONFLICT(student_id) DO UPDATE SET
+                          name = excluded.name, email = excluded.email, course = excluded.course""",
                    (student_id, name, email, course))
 
     conn.commit()
@@ -83,6 +149,22 @@ def log_attendance(student_id, name, status):
     conn.close()
 
 
+def get_last_status_today(student_id):
+    """Return today's most recent attendance status ('login'/'logout') for a student, or None."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    today = datetime.now().date()
+    cursor.execute("""SELECT status FROM attendance
+                      WHERE student_id = ? AND timestamp >= ? AND timestamp < ?
+                      ORDER BY timestamp DESC, id DESC LIMIT 1""",
+                   (student_id, today.isoformat(), (today + timedelta(days=1)).isoformat()))
+    row = cursor.fetchone()
+
+    conn.close()
+    return row[0] if row else None
+
+
 def get_attendance():
     """Return attendance logs."""
     conn = get_connection()
@@ -117,3 +199,120 @@ def get_student_info_from_db():
 
     conn.close()
     return {student_id: name for student_id, name in rows}
+
+
+def get_student_courses():
+    """Return a dict {student_id: course} for partitioning the face gallery."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT student_id, course FROM students")
+    rows = cursor.fetchall()
+
+    conn.close()
+    return {student_id: course for student_id, course in rows}
+
+
+def get_courses():
+    """Return the sorted list of distinct non-empty courses."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT DISTINCT course FROM students WHERE course IS NOT NULL AND course != '' ORDER BY course")
+    courses = [row[0] for row in cursor.fetchall()]
+
+    conn.close()
+    return courses
+
+
+STUDENT_COLUMNS = "student_id, name, email, course, created_at"
+
+
+def list_students_page(after=None, limit=50, course=None):
+    """
+    Return one page of students ordered by (name, student_id) using keyset pagination.
+
+    Args:
+        after (tuple): student_page_key() of the last row on the previous page, or None for the first page
+        limit (int): Page size
+        course (str): Only list students in this course
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    clauses, params = [], []
+    if course:
+        clauses.append("course = ?")
+        params.append(course)
+    if after:
+        clauses.append("(name, student_id) > (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students {where} ORDER BY name, student_id LIMIT ?",
+                   params + [limit])
+    rows = cursor.fetchall()
+
+    conn.close()
+    return rows
+
+
+def student_page_key(row):
+    """Return the keyset cursor (name, student_id) for a row from list_students_page."""
+    return row[1], row[0]
+
+
+def count_students(course=None):
+    """Return the number of registered students (optionally in one course)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    if course:
+        cursor.execute("SELECT COUNT(*) FROM students WHERE course = ?", (course,))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM students")
+    total = cursor.fetchone()[0]
+
+    conn.close()
+    return total
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 prefix query, e.g. 'jan do' -> '"jan"* "do"*'."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_students(text, limit=50, course=None):
+    """
+    Search students by name, email or course (prefix match on each word).
+
+    Uses the FTS5 index when available, otherwise falls back to LIKE.
+    """
+    text = (text or "").strip()
+    if not text:
+        return list_students_page(limit=limit, course=course)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    course_filter = "AND s.course = ?" if course else ""
+    course_params = [course] if course else []
+    try:
+        cursor.execute(f"""SELECT s.student_id, s.name, s.email, s.course, s.created_at
+                           FROM students_fts JOIN students s ON s.rowid = students_fts.rowid
+                           WHERE students_fts MATCH ? {course_filter}
+                           ORDER BY students_fts.rank LIMIT ?""",
+                       [_fts_query(text)] + course_params + [limit])
+    except sqlite3.OperationalError:
+        pattern = f"%{text}%"
+        cursor.execute(f"""SELECT s.student_id, s.name, s.email, s.course, s.created_at
+                           FROM students s
+                           WHERE (s.name LIKE ? OR s.email LIKE ? OR s.course LIKE ? OR s.student_id LIKE ?)
+                           {course_filter}
+                           ORDER BY s.name, s.student_id LIMIT ?""",
+                       [pattern] * 4 + course_params + [limit])
+    rows = cursor.fetchall()
+
+    conn.close()
+    return rows
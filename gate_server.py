@@ -0,0 +1,304 @@
+# gate_server.py — multi-camera gate service (shared models and gallery)
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+from database.db_handler import init_db, log_attendance
+from utils.time_utils import determine_status
+from utils.notification import notify_student_on_login
+from utils.frame_quality import assess_frame, new_quality_stats
+from utils.debounce import get_debouncer, gate_window
+from utils.cascade_matcher import CascadedMatcher
+
+
+# ============ CONFIG ============
+BATCH_SIZE = 8             # max frames embedded per inference round
+BATCH_TIMEOUT = 0.05       # seconds to wait for more frames to fill a batch
+MAX_PENDING_PER_CAMERA = 2 # frames a camera may have queued before it starts dropping
+FRAME_INTERVAL = 0.2       # seconds between frames sampled from each camera
+HANDLER_WORKERS = 2        # threads recording attendance / sending email, off the inference thread
+DEBOUNCE_ID = "gate_server" # one debounce cache for every camera, keyed by student
+# ================================
+
+
+def parse_source(value: str):
+    """
+    Convert a CLI source string to a cv2.VideoCapture argument.
+
+    Digits become device indexes; anything else (RTSP URL, video file) stays a string.
+    """
+    return int(value) if value.isdigit() else value
+
+
+def record_attendance(camera_id: str, student_id: str, name: str, distance: float):
+    """
+    Default match handler: debounce, then log attendance and notify.
+
+    All cameras share one cache keyed by student, so a student seen by two
+    cameras at the same entrance is recorded once; each camera's window still
+    comes from GATE_WINDOWS.
+    """
+    debouncer = get_debouncer(DEBOUNCE_ID)
+    if not debouncer.should_process(student_id, window_seconds=gate_window(camera_id)):
+        return
+    try:
+        status = determine_status(student_id)
+        log_attendance(student_id, name, status)
+    except Exception:
+        # Nothing was recorded: forget the scan so the next frame of this student is not suppressed
+        debouncer.reset(student_id)
+        raise
+    if status == "login":
+        notify_student_on_login(student_id, name)
+    print(f"[INFO] [{camera_id}] {name} ({student_id}) — {status} (distance={distance:.4f})")
+
+
+class CameraStats:
+    """
+    Per-camera counters (guarded by the owning server's lock).
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.frames_read = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.matched = 0
+        self.failed = 0
+        self.pending = 0
+        self.quality = new_quality_stats()
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "frames_read": self.frames_read,
+            "quality_rejected": self.quality["checked"] - self.quality["passed"],
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "matched": self.matched,
+            "failed": self.failed,
+            "pending": self.pending,
+            "processed_per_sec": round(self.processed / elapsed, 2),
+        }
+
+
+class GateServer:
+    """
+    Reads frames from several cameras on worker threads and feeds them into one
+    shared, batched inference queue backed by a single CascadedMatcher.
+
+    Each camera may have at most max_pending frames waiting; beyond that new
+    frames from that camera are dropped, so a busy entrance cannot starve others.
+    Cameras listed in camera_courses search those courses' gallery partitions first.
+    Matches are handed to a small worker pool, so database writes and SMTP never
+    hold up inference.
+    """
+
+    def __init__(self, sources: dict, matcher: CascadedMatcher = None, on_match=record_attendance,
+                 batch_size: int = BATCH_SIZE, batch_timeout: float = BATCH_TIMEOUT,
+                 max_pending: int = MAX_PENDING_PER_CAMERA, frame_interval: float = FRAME_INTERVAL,
+                 loop_files: bool = False, camera_courses: dict = None, handler_workers: int = HANDLER_WORKERS):
+        self.sources = sources
+        self.camera_courses = camera_courses or {}
+        self.matcher = matcher or CascadedMatcher()
+        self.on_match = on_match
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.max_pending = max_pending
+        self.frame_interval = frame_interval
+        self.loop_files = loop_files
+        self.handler_workers = handler_workers
+
+        self.camera_stats = {camera_id: CameraStats() for camera_id in sources}
+        self.batches = 0
+        self.batch_frames = 0
+        self.failed_batches = 0
+        self.handlers_pending = 0
+        self.handler_failures = 0
+        self._handlers = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ---------- camera side ----------
+    def _camera_loop(self, camera_id: str, source):
+        stats = self.camera_stats[camera_id]
+        cam = cv2.VideoCapture(source)
+        if not cam.isOpened():
+            print(f"[ERROR] [{camera_id}] Could not open source {source!r}")
+            return
+
+        print(f"[INFO] [{camera_id}] Reading from {source!r}")
+        while not self._stop.is_set():
+            ret, frame = cam.read()
+            if not ret:
+                if self.loop_files and isinstance(source, str):
+                    cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                print(f"[INFO] [{camera_id}] Source ended")
+                break
+
+            passed, _, _ = assess_frame(frame, stats=stats.quality)
+            with self._lock:
+                stats.frames_read += 1
+                if passed and stats.pending >= self.max_pending:
+                    stats.dropped += 1
+                    passed = False
+                elif passed:
+                    stats.pending += 1
+                    stats.enqueued += 1
+
+            if passed:
+                self._queue.put((camera_id, frame))
+            self._stop.wait(self.frame_interval)
+
+        cam.release()
+
+    # ---------- inference side ----------
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            try:
+                results = self.matcher.match_batch([frame for _, frame in batch],
+                                                   [self.camera_courses.get(camera_id) for camera_id, _ in batch])
+            except Exception as e:
+                # Keep the only inference thread alive and give the cameras their slots back
+                print(f"[ERROR] Inference failed for a batch of {len(batch)} frames: {e}")
+                with self._lock:
+                    self.failed_batches += 1
+                    for camera_id, _ in batch:
+                        stats = self.camera_stats[camera_id]
+                        stats.pending -= 1
+                        stats.failed += 1
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.batch_frames += len(batch)
+
+            for (camera_id, _), best in zip(batch, results):
+                with self._lock:
+                    stats = self.camera_stats[camera_id]
+                    stats.pending -= 1
+                    stats.processed += 1
+                    if best:
+                        stats.matched += 1
+
+                if best and self.on_match is not None:
+                    with self._lock:
+                        self.handlers_pending += 1
+                    self._handlers.submit(self._run_handler, camera_id, best)
+
+    def _run_handler(self, camera_id: str, best: dict):
+        try:
+            self.on_match(camera_id, best["student_id"], best["name"], best["distance"])
+        except Exception as e:
+            print(f"[ERROR] [{camera_id}] Match handler failed: {e}")
+            with self._lock:
+                self.handler_failures += 1
+        finally:
+            with self._lock:
+                self.handlers_pending -= 1
+
+    # ---------- lifecycle ----------
+    def start(self):
+        """
+        Build the gallery (if needed) and start camera and inference threads.
+        """
+        if len(self.matcher) == 0:
+            self.matcher.build()
+
+        self._stop.clear()
+        self._handlers = ThreadPoolExecutor(max_workers=self.handler_workers, thread_name_prefix="gate-handler")
+        self._threads = [threading.Thread(target=self._inference_loop, name="gate-inference", daemon=True)]
+        for camera_id, source in self.sources.items():
+            self._threads.append(threading.Thread(target=self._camera_loop, args=(camera_id, source),
+                                                  name=f"gate-camera-{camera_id}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """
+        Signal all threads to finish and wait for them (including queued match handlers).
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if self._handlers is not None:
+            self._handlers.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Return throughput counters for every camera plus batch statistics.
+        """
+        with self._lock:
+            return {
+                "cameras": {camera_id: s.as_dict() for camera_id, s in self.camera_stats.items()},
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "handlers_pending": self.handlers_pending,
+                "handler_failures": self.handler_failures,
+                "mean_batch_size": round(self.batch_frames / self.batches, 2) if self.batches else 0.0,
+                "cascade": self.matcher.report(),
+            }
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run recognition for several gate cameras in one process.")
+    parser.add_argument("--camera", action="append", required=True, metavar="GATE_ID=SOURCE",
+                        help="e.g. main_gate=0, library=rtsp://..., test=clip.mp4 (repeatable)")
+    parser.add_argument("--course", action="append", default=[], metavar="GATE_ID=COURSE",
+                        help="Search this course first for a gate (repeatable, several courses per gate allowed)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--loop-files", action="store_true", help="Restart video files when they end")
+    parser.add_argument("--stats-every", type=float, default=10.0, help="Seconds between stats printouts")
+    args = parser.parse_args()
+
+    cameras = {}
+    for item in args.camera:
+        gate_id, _, src = item.partition("=")
+        cameras[gate_id] = parse_source(src)
+    courses = {}
+    for item in args.course:
+        gate_id, _, course = item.partition("=")
+        courses.setdefault(gate_id, []).append(course)
+
+    init_db()
+    server = GateServer(cameras, batch_size=args.batch_size, loop_files=args.loop_files,
+                        camera_courses=courses).start()
+    try:
+        while True:
+            time.sleep(args.stats_every)
+            print("[INFO] Stats:", server.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
@@ -1,34 +1,48 @@
 # reports/report.py
 
 import os
-import sqlite3
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+import pandas as pd
+
+from database.archive import get_attendance_range
 
-DB_PATH = "database/attendance.db"
 REPORTS_DIR = "reports/generated"
+REPORT_COLUMNS = ["Student ID", "Name", "Status", "Timestamp"]
+
+
+def fetch_attendance_data(start=None, end=None):
+    """Fetch attendance logs (hot DB plus archived months) between optional start/end dates."""
+    return get_attendance_range(start, end)
+
+
+def build_report_dataframe(start=None, end=None):
+    """Return attendance logs between optional start/end dates as a DataFrame sorted by time."""
+    df = pd.DataFrame(fetch_attendance_data(start, end), columns=REPORT_COLUMNS)
+    return df.sort_values("Timestamp", kind="stable").reset_index(drop=True)
 
 
-def get_connection():
-    """Return a database connection."""
-    return sqlite3.connect(DB_PATH)
+def export_csv(df, start=None, end=None, filename=None):
+    """Write a report DataFrame to REPORTS_DIR as CSV and return the file path."""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+
+    if not filename:
+        span = "_".join(d.strftime("%Y%m%d") for d in (start, end) if d) or "all"
+        filename = f"attendance_report_{span}_{datetime.now().strftime('%H%M%S')}.csv"
 
+    filepath = os.path.join(REPORTS_DIR, filename)
+    df.to_csv(filepath, index=False)
+    print(f"[INFO] CSV report generated: {filepath}")
+    return filepath
 
-def fetch_attendance_data():
-    """Fetch all attendance logs from DB."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT student_id, name, status, timestamp FROM attendance ORDER BY timestamp ASC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
 
+def generate_attendance_report(filename=None, start=None, end=None):
+    """Generate a PDF attendance report, optionally limited to a date range."""
+    # reportlab is only needed for PDFs, so the CSV report works without it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
 
-def generate_attendance_report(filename=None):
-    """Generate a PDF attendance report."""
     os.makedirs(REPORTS_DIR, exist_ok=True)
 
     if not filename:
@@ -47,8 +61,8 @@ def generate_attendance_report(filename=None):
     elements.append(Spacer(1, 12))
 
     # Table data
-    data = [["Student ID", "Name", "Status", "Timestamp"]]
-    records = fetch_attendance_data()
+    data = [REPORT_COLUMNS]
+    records = fetch_attendance_data(start, end)
 
     if not records:
         data.append(["-", "-", "-", "No records available"])
@@ -5,6 +5,7 @@ import cv2
 import sqlite3
 from database.db_handler import init_db, get_connection
 from utils.time_utils import get_current_time
+from utils.frame_quality import assess_frame, new_quality_stats, format_quality_stats
 
 
 DATASET_DIR = "dataset"
@@ -43,12 +44,15 @@ def register_student(student_id: str, name: str, capture_images: bool = True, nu
     return True
 
 
-def capture_face_images(student_id: str, save_dir: str, num_samples: int = 20):
+def capture_face_images(student_id: str, save_dir: str, num_samples: int = 20, thresholds: dict = None):
     """
     Capture face images from webcam for training dataset.
+
+    Frames are screened by utils.frame_quality first, so blurred, badly exposed,
+    small or off-angle faces never reach the gallery.
     """
     cam = cv2.VideoCapture(0)
-    detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    stats = new_quality_stats()
 
     print("[INFO] Starting face capture. Look at the camera...")
 
@@ -58,17 +62,19 @@ def capture_face_images(student_id: str, save_dir: str, num_samples: int = 20):
         if not ret:
             break
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = detector.detectMultiScale(gray, 1.3, 5)
-
-        for (x, y, w, h) in faces:
+        passed, reason, face_box = assess_frame(img, thresholds=thresholds, stats=stats)
+        if passed:
             count += 1
+            x, y, w, h = face_box
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             face_img = gray[y:y + h, x:x + w]
             file_path = os.path.join(save_dir, f"{str(count)}.jpg")
             cv2.imwrite(file_path, face_img)
 
             cv2.rectangle(img, (x, y), (x + w, y + h), (255, 0, 0), 2)
-            cv2.imshow('Registering Face', img)
+        else:
+            cv2.putText(img, f"Rejected: {reason}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv2.imshow('Registering Face', img)
 
         # Stop if 'q' is pressed or enough samples collected
         if cv2.waitKey(100) & 0xFF == ord('q'):
@@ -77,6 +83,7 @@ def capture_face_images(student_id: str, save_dir: str, num_samples: int = 20):
             break
 
     print(f"[INFO] {count} face samples collected for {student_id}")
+    print(f"[INFO] Frame quality: {format_quality_stats(stats)}")
     cam.release()
     cv2.destroyAllWindows()
 
@@ -1,28 +1,49 @@
 # student_view.py
 
 import sqlite3
-from database.db_handler import get_connection
+from database.db_handler import get_connection, list_students_page, student_page_key, search_students
 
 
-def list_students():
+PAGE_SIZE = 50
+
+
+def list_students(page_size: int = PAGE_SIZE, course: str = None):
     """
-    Fetch all registered students from the database.
+    Print registered students page by page (keyset pagination, ordered by name).
+    Press Enter for the next page or 'q' to stop.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT student_id, name, registered_at FROM students")
-    rows = cursor.fetchall()
-    conn.close()
-
+    rows = list_students_page(limit=page_size, course=course)
     if not rows:
         print("[INFO] No students registered yet.")
         return []
 
     print("\n=== Registered Students ===")
-    for row in rows:
-        sid, name, reg_time = row
-        print(f"ID: {sid} | Name: {name} | Registered At: {reg_time}")
+    shown = []
+    while rows:
+        for row in rows:
+            sid, name, email, course_name, reg_time = row
+            print(f"ID: {sid} | Name: {name} | Course: {course_name} | Registered At: {reg_time}")
+        shown.extend(rows)
+
+        if len(rows) < page_size or input("-- more (Enter / q) -- ").strip().lower() == "q":
+            break
+        rows = list_students_page(after=student_page_key(rows[-1]), limit=page_size, course=course)
+
+    return shown
+
+
+def find_students(text: str, limit: int = PAGE_SIZE):
+    """
+    Search students by name, email or course and print the matches.
+    """
+    rows = search_students(text, limit=limit)
+    if not rows:
+        print(f"[INFO] No students match '{text}'")
+        return []
 
+    print(f"\n=== Students matching '{text}' ===")
+    for sid, name, email, course_name, reg_time in rows:
+        print(f"ID: {sid} | Name: {name} | Email: {email} | Course: {course_name}")
     return rows
 
 
@@ -32,7 +53,7 @@ def view_student(student_id: str):
     """
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT student_id, name, registered_at FROM students WHERE student_id = ?", (student_id,))
+    cursor.execute("SELECT student_id, name, created_at FROM students WHERE student_id = ?", (student_id,))
     student = cursor.fetchone()
     conn.close()
 
@@ -50,7 +71,8 @@ def view_student(student_id: str):
 
 # Example usage
 if __name__ == "__main__":
-    students = list_students()
+    query = input("Search students (blank to list all): ").strip()
+    students = find_students(query) if query else list_students()
     if students:
         sid = input("\nEnter a student ID to view details: ")
         view_student(sid)
@@ -5,16 +5,25 @@ import os
 import io
 import pickle
 import numpy as np
+import pandas as pd
 from PIL import Image
 from datetime import datetime, date
 
-from deepface import DeepFace
-
 # Your local modules
-from database.db_handler import init_db, insert_student, list_students, log_attendance
-from utils.time_utils import determine_status
+from database.db_handler import (
+    init_db, add_student, log_attendance, get_courses,
+    list_students_page, student_page_key, search_students, count_students,
+)
+from utils.time_utils import determine_status, get_slot_courses
 from utils.notification import notify_student_on_login
-from report import build_report_dataframe, export_csv  # adjust if your filenames differ
+from utils.frame_quality import QUALITY_THRESHOLDS, assess_frame, new_quality_stats, format_quality_stats
+from utils.debounce import get_debouncer
+from utils.cascade_matcher import CascadedMatcher
+from database.archive import (
+    closed_months, archive_closed_months, compact_database,
+    incremental_vacuum_enabled, enable_incremental_vacuum,
+)
+from gui.report import build_report_dataframe, export_csv
 
 # ----------------------------
 # Paths & bootstrap
@@ -22,6 +31,9 @@ from report import build_report_dataframe, export_csv  # adjust if your filename
 DB_DIR = "database"
 DB_PATH = os.path.join(DB_DIR, "attendance.db")
 IMG_DIR = "student_images"  # DeepFace 'db_path' – each student's images live here
+GATE_ID = "streamlit"  # debounce key shared by every Streamlit session in this process
+STUDENTS_PAGE_SIZE = 50
+STUDENT_TABLE_HEADERS = ["Student ID", "Name", "Email", "Course", "Registered At"]
 
 os.makedirs(DB_DIR, exist_ok=True)
 os.makedirs(IMG_DIR, exist_ok=True)
@@ -84,28 +96,41 @@ def numpy_from_uploaded(uploaded_file) -> np.ndarray:
     return np.array(image)  # RGB
 
 
-def find_best_match_with_deepface(rgb_numpy: np.ndarray, db_path: str):
+@st.cache_resource
+def get_matcher() -> CascadedMatcher:
+    """Build the fast/heavy gallery embeddings once and share them across sessions."""
+    return CascadedMatcher().build()
+
+
+def find_best_match(rgb_numpy: np.ndarray, courses=None):
     """
-    Use DeepFace.find to search inside db_path.
+    Match a frame with the cascaded (fast model, then heavy model) matcher,
+    searching the given courses first when provided.
     Returns (match_path or None, distance or None, df or None)
     """
     try:
-        # DeepFace expects BGR by OpenCV internally, but it accepts numpy RGB as well.
-        # We'll pass RGB; DeepFace handles conversions inside.
-        results = DeepFace.find(img_path=rgb_numpy, db_path=db_path, enforce_detection=False)
-
-        # DeepFace.find returns a list of DataFrames (one per model/backend). If default model used, it's a list with one DF.
-        if isinstance(results, list) and len(results) > 0 and not results[0].empty:
-            df = results[0].sort_values(by="distance", ascending=True).reset_index(drop=True)
-            best_row = df.iloc[0]
-            return best_row.get("identity"), float(best_row.get("distance", np.nan)), df
+        # DeepFace treats numpy input as BGR (OpenCV order)
+        result = get_matcher().match(rgb_numpy[:, :, ::-1], courses=courses)
+        if result:
+            df = pd.DataFrame(result["candidates"])
+            return result["identity"], result["distance"], df
         else:
             return None, None, None
     except Exception as e:
-        st.error(f"DeepFace.find failed: {e}")
+        st.error(f"Face matching failed: {e}")
         return None, None, None
 
 
+def upload_key(uploaded_file) -> str:
+    """Stable identifier for a Streamlit UploadedFile across reruns."""
+    return getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+
+
+def set_debounce_window():
+    """on_change callback: apply the Gate settings window to the shared debouncer."""
+    get_debouncer(GATE_ID, window_seconds=st.session_state["debounce_window"])
+
+
 def parse_student_from_identity_path(identity_path: str):
     """
     Given a path like 'student_images/12345_John Doe/img1.jpg',
@@ -132,34 +157,100 @@ if menu == "📷 Start Camera":
         icon="💡",
     )
 
-    captured = st.camera_input("Capture a photo")
-    if captured:
-        # Convert to numpy RGB
-        img_np = numpy_from_uploaded(captured)
-
-        # Find best match in the DB
-        best_identity, distance, df = find_best_match_with_deepface(img_np, IMG_DIR)
+    if "quality_stats" not in st.session_state:
+        st.session_state["quality_stats"] = new_quality_stats()
+
+    with st.expander("Frame quality settings"):
+        quality_thresholds = {
+            "min_sharpness": st.slider("Minimum sharpness (Laplacian variance)", 0.0, 500.0,
+                                       float(QUALITY_THRESHOLDS["min_sharpness"])),
+            "min_brightness": st.slider("Minimum brightness", 0.0, 255.0, float(QUALITY_THRESHOLDS["min_brightness"])),
+            "max_brightness": st.slider("Maximum brightness", 0.0, 255.0, float(QUALITY_THRESHOLDS["max_brightness"])),
+            "min_face_ratio": st.slider("Minimum face width (fraction of frame)", 0.0, 1.0,
+                                        float(QUALITY_THRESHOLDS["min_face_ratio"])),
+            "max_asymmetry": st.slider("Maximum pose asymmetry", 0.0, 1.0, float(QUALITY_THRESHOLDS["max_asymmetry"])),
+        }
+        st.caption(format_quality_stats(st.session_state["quality_stats"]))
+
+    course_options = ["All courses", "Current timetable slot"] + get_courses()
+    session_course = st.selectbox("Session course (searched first)", course_options)
+    if session_course == "All courses":
+        session_courses = None
+    elif session_course == "Current timetable slot":
+        session_courses = get_slot_courses()
+        st.caption(f"Slot courses: {', '.join(session_courses) if session_courses else 'none scheduled'}")
+    else:
+        session_courses = [session_course]
+
+    with st.expander("Gate settings"):
+        debouncer = get_debouncer(GATE_ID)
+        # Process-wide setting: seed from the shared debouncer and only write it back on change,
+        # so opening this page in another session doesn't reset it
+        st.number_input(
+            "Ignore repeat scans of the same student for (seconds)",
+            min_value=0,
+            value=int(debouncer.window_seconds),
+            key="debounce_window",
+            on_change=set_debounce_window,
+        )
+        st.caption(f"Debounce: {debouncer.stats()}")
 
-        if best_identity:
-            student_id, name = parse_student_from_identity_path(best_identity)  # from folder
-            if not student_id or not name:
-                st.warning("Matched an image, but folder name didn’t follow 'ID_Name' format.")
-            else:
-                status = determine_status(student_id)
-                log_attendance(student_id, name, status)
+    with st.expander("Matcher stats"):
+        st.json(get_matcher().report())
+        if st.button("Rebuild gallery embeddings"):
+            get_matcher().build()
+            st.success("Gallery embeddings refreshed.")
 
-                if status == "login":
-                    notify_student_on_login(student_id, name)
+    captured = st.camera_input("Capture a photo")
+    # camera_input returns the last photo on every rerun (e.g. after moving a slider);
+    # only assess, match and record a photo once
+    if captured and upload_key(captured) == st.session_state.get("last_scan_key"):
+        st.caption("This photo was already processed. Take a new photo to scan again.")
+    elif captured:
+        st.session_state["last_scan_key"] = upload_key(captured)
 
-                st.success(f"✅ Recognized: **{name}** ({student_id}) — *{status}*")
-                if distance is not None:
-                    st.caption(f"Match distance: {distance:.4f}  (lower is closer)")
+        # Convert to numpy RGB
+        img_np = numpy_from_uploaded(captured)
 
-                with st.expander("Show top matches"):
-                    if df is not None:
-                        st.dataframe(df[["identity", "distance"]].head(10), use_container_width=True)
+        # Cheap quality gate before the expensive DeepFace search
+        passed, reason, _ = assess_frame(
+            img_np, thresholds=quality_thresholds, stats=st.session_state["quality_stats"], is_rgb=True
+        )
+        if not passed:
+            st.warning(f"⚠️ Frame rejected ({reason}). Please face the camera in good light and try again.")
         else:
-            st.error("❌ No match found. Consider registering this student or adding more images.")
+            # Find best match in the DB
+            best_identity, distance, df = find_best_match(img_np, session_courses)
+            if best_identity:
+                student_id, name = parse_student_from_identity_path(best_identity)  # from folder
+                if not student_id or not name:
+                    st.warning("Matched an image, but folder name didn’t follow 'ID_Name' format.")
+                elif not debouncer.should_process(student_id):
+                    # Repeat scan inside the window: skip DB writes and emails
+                    st.info(f"ℹ️ {name} ({student_id}) was already recorded moments ago.")
+                else:
+                    try:
+                        status = determine_status(student_id)
+                        log_attendance(student_id, name, status)
+                    except Exception as e:
+                        # Nothing was recorded: forget the scan so a retry of this photo goes through
+                        debouncer.reset(student_id)
+                        st.session_state.pop("last_scan_key", None)
+                        st.error(f"Failed to record attendance for {name} ({student_id}): {e}")
+                        st.stop()
+
+                    if status == "login":
+                        notify_student_on_login(student_id, name)
+
+                    st.success(f"✅ Recognized: **{name}** ({student_id}) — *{status}*")
+                    if distance is not None:
+                        st.caption(f"Match distance: {distance:.4f}  (lower is closer)")
+
+                    with st.expander("Show top matches"):
+                        if df is not None:
+                            st.dataframe(df[["identity", "distance"]].head(10), use_container_width=True)
+            else:
+                st.error("❌ No match found. Consider registering this student or adding more images.")
 
 
 # ----------------------------
@@ -182,23 +273,28 @@ elif menu == "📝 Register Student":
                 st.error("Please fill all fields.")
             else:
                 try:
-                    insert_student(student_id, name, email, course)
+                    add_student(student_id, name, email, course)
                     st.success(f"✅ Student saved: {name} ({student_id})")
                     st.session_state["reg_student"] = (student_id, name)
                 except Exception as e:
-                    st.error(f"Failed to insert student: {e}")
+                    st.error(f"Failed to save student: {e}")
 
     # Images collection for the just-registered student
     if "reg_student" in st.session_state:
         sid, sname = st.session_state["reg_student"]
         st.markdown("### Add Face Images")
         tab_cap, tab_up = st.tabs(["📸 Capture", "📂 Upload"])
+        # Widget values survive reruns; remember what was already saved so each file
+        # is written (and the gallery rebuilt) only once
+        saved_uploads = st.session_state.setdefault("saved_uploads", set())
 
         with tab_cap:
             st.info("Capture 1–5 photos. Click after each capture to save.", icon="📷")
             captured_img = st.camera_input("Capture image")
-            if captured_img:
+            if captured_img and upload_key(captured_img) not in saved_uploads:
                 path = save_image_bytes_to_student_dir(sid, sname, captured_img.getvalue(), suffix="_cap")
+                saved_uploads.add(upload_key(captured_img))
+                get_matcher().build()
                 st.success(f"Saved: `{os.path.relpath(path)}`")
 
         with tab_up:
@@ -207,20 +303,23 @@ elif menu == "📝 Register Student":
                 type=["jpg", "jpeg", "png"],
                 accept_multiple_files=True,
             )
-            if files:
+            new_files = [f for f in files or [] if upload_key(f) not in saved_uploads]
+            if new_files:
                 saved_count = 0
-                for f in files:
+                for f in new_files:
                     try:
                         path = save_image_bytes_to_student_dir(sid, sname, f.getvalue(), suffix="_up")
+                        saved_uploads.add(upload_key(f))
                         saved_count += 1
                     except Exception as e:
                         st.error(f"Failed to save {f.name}: {e}")
                 if saved_count:
+                    get_matcher().build()
                     st.success(f"✅ Saved {saved_count} images to `{IMG_DIR}/{sid}_{sname}/`")
 
         st.caption(
             "DeepFace doesn’t require a separate training step. "
-            "Once images are in the database folder, recognition is ready."
+            "New images are embedded as soon as they are saved, so recognition is ready right away."
         )
 
 
@@ -230,8 +329,39 @@ elif menu == "📝 Register Student":
 elif menu == "👨‍🎓 View Students":
     st.subheader("Registered Students")
     try:
-        df = list_students()  # should return a pandas DataFrame
-        st.dataframe(df, use_container_width=True)
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            query = st.text_input("Search by name, email or course").strip()
+        with col2:
+            course_filter = st.selectbox("Course", ["All courses"] + get_courses())
+        course = None if course_filter == "All courses" else course_filter
+
+        # Reset paging whenever the filter changes; each entry is the cursor a page starts after
+        filter_key = (query, course)
+        if st.session_state.get("students_filter") != filter_key:
+            st.session_state["students_filter"] = filter_key
+            st.session_state["students_cursors"] = [None]
+        cursors = st.session_state["students_cursors"]
+
+        if query:
+            rows = search_students(query, limit=STUDENTS_PAGE_SIZE, course=course)
+            st.caption(f"Top {len(rows)} matches")
+        else:
+            rows = list_students_page(after=cursors[-1], limit=STUDENTS_PAGE_SIZE, course=course)
+            st.caption(f"Page {len(cursors)} · {count_students(course)} students")
+
+        st.dataframe(pd.DataFrame(rows, columns=STUDENT_TABLE_HEADERS), use_container_width=True)
+
+        if not query:
+            prev_col, next_col = st.columns(2)
+            with prev_col:
+                if st.button("⬅️ Previous", disabled=len(cursors) == 1):
+                    cursors.pop()
+                    st.rerun()
+            with next_col:
+                if st.button("Next ➡️", disabled=len(rows) < STUDENTS_PAGE_SIZE):
+                    cursors.append(student_page_key(rows[-1]))
+                    st.rerun()
     except Exception as e:
         st.error(f"Could not load students: {e}")
 
@@ -249,13 +379,13 @@ elif menu == "📄 Generate Report":
 
     if st.button("Build Report"):
         try:
-            df = build_report_dataframe(start, end)  # implement in report.py
+            df = build_report_dataframe(start, end)
             if df is None or df.empty:
                 st.warning("No attendance records found for the selected range.")
             else:
                 st.success(f"Report rows: {len(df)}")
                 st.dataframe(df, use_container_width=True)
-                csv_path = export_csv(df, start, end)  # implement in report.py
+                csv_path = export_csv(df, start, end)
                 st.download_button(
                     "Download CSV",
                     data=open(csv_path, "rb").read(),
@@ -290,6 +420,31 @@ elif menu == "🧰 Database / Images":
             imgs = [f for f in os.listdir(folder) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
             st.write(f"- `{d}` — {len(imgs)} images")
 
+    st.subheader("Attendance History")
+    pending_months = closed_months()
+    st.write(f"🗄 Closed months still in the live database: **{len(pending_months)}**")
+    to_parquet = st.checkbox("Convert archives to compressed Parquet", value=False)
+    if st.button("Archive closed months"):
+        with st.spinner("Archiving in small batches (gates keep working)..."):
+            results = archive_closed_months(to_parquet=to_parquet)
+            reclaimed = compact_database() if incremental_vacuum_enabled() else None
+        if reclaimed is None:
+            st.success(f"✅ Archived {len(results)} month(s). Enable space reclamation below to shrink the file.")
+        else:
+            st.success(f"✅ Archived {len(results)} month(s); reclaimed {reclaimed} free pages.")
+
+    if not incremental_vacuum_enabled():
+        st.warning(
+            "This database was created before space reclamation was available, so archived rows "
+            "do not shrink the file. Enabling it runs a one-time full VACUUM that locks the database "
+            "while it runs — do this when no gates are in use."
+        )
+        if st.button("Enable space reclamation (one-time VACUUM)"):
+            with st.spinner("Running VACUUM..."):
+                enable_incremental_vacuum()
+            st.success("✅ Space reclamation enabled; future archiving will shrink the database file.")
+    st.caption("Archived months stay searchable in reports; per-student monthly totals remain in the live database.")
+
 
 # ----------------------------
 # ℹ️ Help
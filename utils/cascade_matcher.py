@@ -0,0 +1,221 @@
+# utils/cascade_matcher.py
+
+import threading
+import time
+
+from utils.gallery import GalleryIndex, embed_batch
+
+
+# ============ CONFIG ============
+FAST_MODEL = "SFace"          # small, fast model run on every probe
+HEAVY_MODEL = "ArcFace"       # heavier model run only on borderline probes
+FAST_THRESHOLD = 0.593        # cosine distance; DeepFace's SFace threshold
+HEAVY_THRESHOLD = 0.68        # cosine distance; DeepFace's ArcFace threshold
+MARGIN_THRESHOLD = 0.10       # top-2 minus top-1 fast distance needed to exit early
+RERANK_CANDIDATES = 5         # fast-model shortlist the heavy model re-ranks
+# ================================
+
+
+class CascadedMatcher:
+    """
+    Two-stage face matcher.
+
+    Every probe is embedded with the fast model and searched in its gallery. If
+    the best match is under FAST_THRESHOLD and beats the runner-up by at least
+    MARGIN_THRESHOLD, the result is returned straight away. Otherwise the heavy
+    model embeds the probe and re-ranks only the fast model's shortlist.
+
+    Probes bound to a course search that course's gallery partition first and
+    only fall back to every student when the partition has no confident match.
+    """
+
+    def __init__(self, fast_index: GalleryIndex = None, heavy_index: GalleryIndex = None,
+                 fast_threshold: float = FAST_THRESHOLD, heavy_threshold: float = HEAVY_THRESHOLD,
+                 margin_threshold: float = MARGIN_THRESHOLD, rerank_candidates: int = RERANK_CANDIDATES):
+        self.fast_index = fast_index or GalleryIndex(FAST_MODEL)
+        self.heavy_index = heavy_index or GalleryIndex(HEAVY_MODEL)
+        self.fast_threshold = fast_threshold
+        self.heavy_threshold = heavy_threshold
+        self.margin_threshold = margin_threshold
+        self.rerank_candidates = rerank_candidates
+
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.early_exits = 0
+        self.escalated = 0
+        self.heavy_embedded = 0
+        self.partition_hits = 0
+        self.global_fallbacks = 0
+        self.total_seconds = 0.0
+        self.fast_seconds = 0.0
+        self.heavy_seconds = 0.0
+
+    def build(self):
+        """
+        Build (or refresh) the gallery embeddings for both models.
+        """
+        self.fast_index.build()
+        self.heavy_index.build()
+        return self
+
+    def __len__(self):
+        return len(self.fast_index)
+
+    def _is_confident(self, candidates):
+        if not candidates or candidates[0]["distance"] > self.fast_threshold:
+            return False
+        if len(candidates) == 1:
+            return True
+        return candidates[1]["distance"] - candidates[0]["distance"] >= self.margin_threshold
+
+    def _cascade(self, images, indexes, fast_embeddings, heavy_cache, courses_for):
+        """
+        Run the fast/heavy cascade for images[indexes], searching the partitions
+        given by courses_for(i).
+
+        Returns:
+            ({i: result}, escalated indexes, heavy_seconds, heavy_embedded)
+        """
+        results = {}
+        shortlists = {}
+        escalate = []
+        for i in indexes:
+            candidates = self.fast_index.search(fast_embeddings[i], top_k=self.rerank_candidates,
+                                                courses=courses_for(i))
+            if self._is_confident(candidates):
+                results[i] = dict(candidates[0], stage="fast", candidates=candidates)
+            elif candidates:
+                shortlists[i] = candidates
+                escalate.append(i)
+
+        heavy_started = time.perf_counter()
+        missing = [i for i in escalate if i not in heavy_cache]
+        if missing:
+            heavy_embeddings = embed_batch([images[i] for i in missing], self.heavy_index.model_name,
+                                           self.heavy_index.detector_backend)
+            heavy_cache.update(zip(missing, heavy_embeddings))
+
+        for i in escalate:
+            shortlist_ids = [c["student_id"] for c in shortlists[i]]
+            reranked = self.heavy_index.search(heavy_cache[i], top_k=len(shortlist_ids), student_ids=shortlist_ids)
+            if reranked and reranked[0]["distance"] <= self.heavy_threshold:
+                results[i] = dict(reranked[0], stage="heavy", candidates=reranked)
+        return results, escalate, time.perf_counter() - heavy_started, len(missing)
+
+    def match_batch(self, images, courses=None):
+        """
+        Match a batch of BGR images (or paths).
+
+        Args:
+            images (list): BGR numpy arrays or image paths
+            courses (list): Optional, one entry per image: None to search every
+                student, or a list of courses to search first. A course-bound
+                image falls back to the global index only if its partition gives
+                no confident match.
+
+        Returns:
+            One result per image: None when nothing matched, otherwise a dict with
+            identity, student_id, name, distance, stage ("fast"/"heavy"), scope
+            ("course"/"global") and the ranked candidates list.
+        """
+        courses = courses or [None] * len(images)
+        started = time.perf_counter()
+        fast_embeddings = embed_batch(images, self.fast_index.model_name, self.fast_index.detector_backend)
+        heavy_cache = {}
+        partition_hits = fallbacks = heavy_embedded = 0
+        heavy_seconds = 0.0
+        escalated = set()  # probes that reached the heavy model in either pass
+
+        results = [None] * len(images)
+        scoped = [i for i, emb in enumerate(fast_embeddings) if emb is not None and courses[i]]
+        if scoped:
+            found, esc, secs, embedded = self._cascade(images, scoped, fast_embeddings, heavy_cache,
+                                                       lambda i: courses[i])
+            escalated.update(esc)
+            heavy_seconds += secs
+            heavy_embedded += embedded
+            for i, result in found.items():
+                results[i] = dict(result, scope="course")
+            partition_hits += len(found)
+
+        remaining = [i for i, emb in enumerate(fast_embeddings) if emb is not None and results[i] is None]
+        if remaining:
+            found, esc, secs, embedded = self._cascade(images, remaining, fast_embeddings, heavy_cache,
+                                                       lambda i: None)
+            escalated.update(esc)
+            heavy_seconds += secs
+            heavy_embedded += embedded
+            for i, result in found.items():
+                results[i] = dict(result, scope="global")
+            fallbacks += len([i for i in remaining if courses[i]])
+        elapsed = time.perf_counter() - started
+
+        # Counted per scan: an early exit is a match for which the heavy model never ran
+        early_exits = sum(1 for i, result in enumerate(results) if result and i not in escalated)
+
+        with self._lock:
+            self.scans += len(images)
+            self.early_exits += early_exits
+            self.escalated += len(escalated)
+            self.heavy_embedded += heavy_embedded
+            self.partition_hits += partition_hits
+            self.global_fallbacks += fallbacks
+            self.total_seconds += elapsed
+            self.fast_seconds += elapsed - heavy_seconds
+            self.heavy_seconds += heavy_seconds
+        return results
+
+    def match(self, image, courses=None):
+        """
+        Match a single BGR image (or path); see match_batch.
+        """
+        return self.match_batch([image], [courses])[0]
+
+    def report(self):
+        """
+        Return cascade statistics.
+
+        latency_reduction compares the mean cascaded latency against a heavy-only
+        pipeline, estimated from the measured heavy-model cost per embedded probe
+        (None until at least one probe has reached the heavy model).
+        """
+        with self._lock:
+            scans = self.scans
+            early_exits = self.early_exits
+            escalated = self.escalated
+            partition_hits = self.partition_hits
+            global_fallbacks = self.global_fallbacks
+            mean_total = self.total_seconds / scans if scans else 0.0
+            mean_fast = self.fast_seconds / scans if scans else 0.0
+            mean_heavy = self.heavy_seconds / self.heavy_embedded if self.heavy_embedded else None
+
+        reduction = None
+        if mean_heavy:
+            reduction = 1.0 - mean_total / mean_heavy
+        return {
+            "scans": scans,
+            "early_exit_rate": round(early_exits / scans, 3) if scans else 0.0,
+            "escalations": escalated,
+            "course_partition_hits": partition_hits,
+            "global_fallbacks": global_fallbacks,
+            "mean_latency_ms": round(mean_total * 1000, 1),
+            "mean_fast_stage_ms": round(mean_fast * 1000, 1),
+            "mean_heavy_stage_ms": round(mean_heavy * 1000, 1) if mean_heavy is not None else None,
+            "latency_reduction": round(reduction, 3) if reduction is not None else None,
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    matcher = CascadedMatcher().build()
+    while True:
+        probe = input("Enter path of a probe image (blank to stop): ").strip()
+        if not probe:
+            break
+        result = matcher.match(probe)
+        if result:
+            print(f"[INFO] {result['student_id']} | {result['name']} | "
+                  f"distance={result['distance']:.4f} | stage={result['stage']}")
+        else:
+            print("[INFO] No match")
+    print("[INFO] Cascade report:", matcher.report())
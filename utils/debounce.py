@@ -0,0 +1,124 @@
+# utils/debounce.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# ============ CONFIG ============
+DEFAULT_WINDOW_SECONDS = 60      # ignore repeat recognitions of a student within this window
+DEFAULT_MAX_ENTRIES = 5000       # bound on remembered students per debouncer (LRU evicted)
+GATE_WINDOWS = {                 # per-gate window overrides, looked up by gate_window()
+    # "main_gate": 60,
+    # "library": 300,
+}
+# ================================
+
+
+class RecognitionDebouncer:
+    """
+    Time-windowed TTL cache keyed by student_id.
+
+    The first recognition of a student is accepted; repeats inside the window are
+    dropped so they never reach determine_status, log_attendance or SMTP. The
+    cache is bounded and evicts the least recently seen student when full.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # student_id -> last accepted time (monotonic)
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.suppressed = 0
+
+    def should_process(self, student_id: str, now: float = None, window_seconds: float = None):
+        """
+        Return True if this recognition should be recorded, False if it is a repeat.
+
+        window_seconds overrides the debouncer's window for this check, so one
+        cache can serve several gates with different windows.
+
+        Accepting a scan reserves the student for the window straight away (so
+        concurrent scans can't both get through); callers must reset(student_id)
+        if recording it then fails.
+        """
+        now = time.monotonic() if now is None else now
+        window = self.window_seconds if window_seconds is None else window_seconds
+        with self._lock:
+            last_seen = self._entries.get(student_id)
+            if last_seen is not None and now - last_seen < window:
+                self._entries.move_to_end(student_id)
+                self.suppressed += 1
+                return False
+
+            self._entries[student_id] = now
+            self._entries.move_to_end(student_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.accepted += 1
+            return True
+
+    def reset(self, student_id: str = None):
+        """
+        Forget one student (or everyone when student_id is None).
+        """
+        with self._lock:
+            if student_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(student_id, None)
+
+    def stats(self):
+        """
+        Return a dict of counters for display/logging.
+        """
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "tracked": len(self._entries),
+                "accepted": self.accepted,
+                "suppressed": self.suppressed,
+            }
+
+
+_debouncers = {}
+_registry_lock = threading.Lock()
+
+
+def gate_window(gate_id: str):
+    """
+    Return the debounce window configured for a gate (GATE_WINDOWS or the default).
+    """
+    return GATE_WINDOWS.get(gate_id, DEFAULT_WINDOW_SECONDS)
+
+
+def get_debouncer(gate_id: str = "default", window_seconds: float = None):
+    """
+    Return the process-wide debouncer registered under gate_id, creating it on first use.
+
+    The window comes from (in order) the window_seconds argument, GATE_WINDOWS,
+    then DEFAULT_WINDOW_SECONDS. Passing window_seconds updates an existing gate.
+    Cameras that share an entrance should share one debouncer (and pass their
+    own window to should_process) so a student is not recorded once per camera.
+    """
+    with _registry_lock:
+        debouncer = _debouncers.get(gate_id)
+        if debouncer is None:
+            if window_seconds is None:
+                window_seconds = gate_window(gate_id)
+            debouncer = RecognitionDebouncer(window_seconds)
+            _debouncers[gate_id] = debouncer
+        elif window_seconds is not None:
+            debouncer.window_seconds = window_seconds
+        return debouncer
+
+
+# Example usage
+if __name__ == "__main__":
+    gate = get_debouncer("main_gate", window_seconds=2)
+    print("[INFO] First scan accepted?:", gate.should_process("SCS/001/2024"))
+    print("[INFO] Repeat scan accepted?:", gate.should_process("SCS/001/2024"))
+    time.sleep(2.1)
+    print("[INFO] After window accepted?:", gate.should_process("SCS/001/2024"))
+    print("[INFO] Stats:", gate.stats())
@@ -0,0 +1,164 @@
+# utils/frame_quality.py
+
+import threading
+import cv2
+import numpy as np
+
+
+# ============ CONFIG ============
+QUALITY_THRESHOLDS = {
+    "downscale_width": 320,      # width (px) the frame is shrunk to before any check
+    "min_sharpness": 60.0,       # Laplacian variance below this is treated as blurred
+    "min_brightness": 50.0,      # mean grey level (0-255) below this is too dark
+    "max_brightness": 210.0,     # mean grey level (0-255) above this is washed out
+    "min_face_ratio": 0.15,      # face width / frame width below this is too small/far
+    "max_asymmetry": 0.30,       # left/right face half difference above this is off-angle
+}
+# ================================
+
+REJECT_REASONS = ("blur", "exposure", "no_face", "face_size", "pose")
+
+_local = threading.local()
+
+
+def get_face_detector():
+    """
+    Return a Haar cascade face detector, loaded once per thread
+    (CascadeClassifier instances must not be shared between threads).
+    """
+    detector = getattr(_local, "face_detector", None)
+    if detector is None:
+        detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        _local.face_detector = detector
+    return detector
+
+
+def new_quality_stats():
+    """
+    Return an empty counter dict for tracking how many frames each check rejected.
+    """
+    stats = {"checked": 0, "passed": 0}
+    for reason in REJECT_REASONS:
+        stats[reason] = 0
+    return stats
+
+
+def downscale(gray: np.ndarray, target_width: int):
+    """
+    Shrink a greyscale frame to target_width (keeping aspect ratio).
+
+    Returns:
+        (small_frame, scale) where scale maps small coordinates back to the original.
+    """
+    h, w = gray.shape[:2]
+    if w <= target_width:
+        return gray, 1.0
+    scale = w / float(target_width)
+    small = cv2.resize(gray, (target_width, int(round(h / scale))), interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+def face_asymmetry(face_gray: np.ndarray):
+    """
+    Estimate how far a face is turned away from the camera.
+
+    Compares the left half of the face with the mirrored right half; a frontal
+    face is roughly symmetric, so the normalised difference grows with yaw.
+    """
+    h, w = face_gray.shape[:2]
+    half = w // 2
+    if half == 0:
+        return 1.0
+    left = face_gray[:, :half].astype(np.float32)
+    right = np.fliplr(face_gray[:, w - half:]).astype(np.float32)
+    return float(np.mean(np.abs(left - right)) / 255.0)
+
+
+def assess_frame(frame: np.ndarray, thresholds: dict = None, stats: dict = None, is_rgb: bool = False):
+    """
+    Run the cheap quality checks on a frame before it is sent to the embedding model.
+
+    Checks (in order, cheapest first) blur, exposure, face presence, face size and
+    pose, all on a downscaled greyscale copy of the frame.
+
+    Args:
+        frame (np.ndarray): BGR frame (or RGB when is_rgb=True)
+        thresholds (dict): Overrides for QUALITY_THRESHOLDS
+        stats (dict): Counter dict from new_quality_stats(); updated in place
+        is_rgb (bool): True if the frame is RGB (e.g. from PIL / Streamlit)
+
+    Returns:
+        (passed, reason, face_box) where reason is None on success and face_box is
+        (x, y, w, h) of the largest face in full-resolution coordinates (or None).
+    """
+    limits = dict(QUALITY_THRESHOLDS)
+    if thresholds:
+        limits.update(thresholds)
+
+    if stats is not None:
+        stats["checked"] += 1
+
+    def reject(reason):
+        if stats is not None:
+            stats[reason] += 1
+        return False, reason, None
+
+    if frame.ndim == 3:
+        code = cv2.COLOR_RGB2GRAY if is_rgb else cv2.COLOR_BGR2GRAY
+        gray = cv2.cvtColor(frame, code)
+    else:
+        gray = frame
+
+    small, scale = downscale(gray, int(limits["downscale_width"]))
+
+    # 1. Blur
+    sharpness = cv2.Laplacian(small, cv2.CV_64F).var()
+    if sharpness < limits["min_sharpness"]:
+        return reject("blur")
+
+    # 2. Exposure
+    brightness = float(small.mean())
+    if brightness < limits["min_brightness"] or brightness > limits["max_brightness"]:
+        return reject("exposure")
+
+    # 3. Face presence (on the small frame only)
+    faces = get_face_detector().detectMultiScale(small, 1.2, 5)
+    if len(faces) == 0:
+        return reject("no_face")
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+
+    # 4. Face size
+    if w / float(small.shape[1]) < limits["min_face_ratio"]:
+        return reject("face_size")
+
+    # 5. Pose
+    if face_asymmetry(small[y:y + h, x:x + w]) > limits["max_asymmetry"]:
+        return reject("pose")
+
+    if stats is not None:
+        stats["passed"] += 1
+
+    face_box = tuple(int(round(v * scale)) for v in (x, y, w, h))
+    return True, None, face_box
+
+
+def format_quality_stats(stats: dict):
+    """
+    Convert a stats dict into a one-line summary string.
+    """
+    rejected = ", ".join(f"{reason}={stats.get(reason, 0)}" for reason in REJECT_REASONS)
+    return f"checked={stats.get('checked', 0)} passed={stats.get('passed', 0)} | rejected: {rejected}"
+
+
+# Example usage
+if __name__ == "__main__":
+    cam = cv2.VideoCapture(0)
+    counters = new_quality_stats()
+    for _ in range(50):
+        ok, img = cam.read()
+        if not ok:
+            break
+        passed, reason, box = assess_frame(img, stats=counters)
+        print("[INFO] Frame:", "ok" if passed else f"rejected ({reason})", box)
+    cam.release()
+    print("[INFO] Quality:", format_quality_stats(counters))
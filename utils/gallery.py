@@ -0,0 +1,233 @@
+# utils/gallery.py
+
+import os
+import pickle
+import threading
+import numpy as np
+from deepface import DeepFace
+
+from database.db_handler import get_student_courses
+
+
+# ============ CONFIG ============
+IMG_DIR = "student_images"             # same folder layout as main.py: <STUDENT_ID>_<FULL_NAME>/image.jpg
+CACHE_DIR = "database/gallery_cache"   # per-model embedding cache (pickle)
+DEFAULT_MODEL = "VGG-Face"             # DeepFace.find default
+DETECTOR_BACKEND = "opencv"
+MATCH_THRESHOLD = 0.68                 # cosine distance; DeepFace's VGG-Face threshold
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+# ================================
+
+
+def parse_student_from_identity_path(identity_path: str):
+    """
+    Given a path like 'student_images/12345_John Doe/img1.jpg',
+    return ('12345', 'John Doe').
+    """
+    base = os.path.basename(os.path.dirname(identity_path))
+    parts = base.split("_", 1)
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return None, None
+
+
+def embed_image(img, model_name: str = DEFAULT_MODEL, detector_backend: str = DETECTOR_BACKEND):
+    """
+    Return the L2-normalised embedding of the largest face in img, or None.
+
+    Args:
+        img: Image path or BGR numpy array
+        model_name (str): DeepFace model name
+        detector_backend (str): DeepFace detector backend ("skip" for pre-cropped faces)
+    """
+    try:
+        reps = DeepFace.represent(img_path=img, model_name=model_name,
+                                  detector_backend=detector_backend, enforce_detection=False)
+    except Exception as e:
+        print(f"[ERROR] DeepFace.represent failed: {e}")
+        return None
+
+    if not reps:
+        return None
+    rep = max(reps, key=lambda r: r.get("facial_area", {}).get("w", 0) * r.get("facial_area", {}).get("h", 0))
+    vec = np.asarray(rep["embedding"], dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else None
+
+
+def embed_batch(images, model_name: str = DEFAULT_MODEL, detector_backend: str = DETECTOR_BACKEND):
+    """
+    Embed a batch of images with one model instance.
+
+    DeepFace.represent takes one image per call, so this loops; callers still
+    gain by funnelling every camera through a single worker and model copy.
+    """
+    return [embed_image(img, model_name, detector_backend) for img in images]
+
+
+class GalleryIndex:
+    """
+    In-memory embedding index over the student_images/ tree for one model.
+
+    Embeddings are computed once and cached on disk keyed by file path and
+    modification time, so rebuilding only embeds new or changed images.
+    Images are also partitioned by the student's course (students.course) so a
+    session bound to a course only scans that slice. Safe to share between threads.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, img_dir: str = IMG_DIR, cache_dir: str = CACHE_DIR,
+                 detector_backend: str = DETECTOR_BACKEND):
+        self.model_name = model_name
+        self.img_dir = img_dir
+        self.cache_dir = cache_dir
+        self.detector_backend = detector_backend
+        self.identities = []
+        self.student_ids = []
+        self.names = []
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.partitions = {}  # course -> (row indexes, embedding sub-matrix)
+        self.student_rows = {}  # student_id -> row indexes
+        self._lock = threading.RLock()
+
+    @property
+    def cache_path(self):
+        return os.path.join(self.cache_dir, f"{self.model_name.replace('/', '_')}.pkl")
+
+    def __len__(self):
+        return len(self.identities)
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"[ERROR] Could not read gallery cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_cache(self, cache: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path, "wb") as f:
+            pickle.dump(cache, f)
+
+    def build(self):
+        """
+        Scan img_dir and (re)build the index, embedding only new or changed images.
+        """
+        cache = self._load_cache()
+        courses = get_student_courses()
+        fresh = {}
+        identities, student_ids, names, vectors = [], [], [], []
+
+        if os.path.isdir(self.img_dir):
+            for folder in sorted(os.listdir(self.img_dir)):
+                folder_path = os.path.join(self.img_dir, folder)
+                if not os.path.isdir(folder_path):
+                    continue
+                for filename in sorted(os.listdir(folder_path)):
+                    if not filename.lower().endswith(IMAGE_EXTS):
+                        continue
+                    path = os.path.join(folder_path, filename)
+                    student_id, name = parse_student_from_identity_path(path)
+                    if not student_id:
+                        continue
+
+                    mtime = os.path.getmtime(path)
+                    cached = cache.get(path)
+                    if cached is not None and cached[0] == mtime:
+                        vec = cached[1]
+                    else:
+                        vec = embed_image(path, self.model_name, self.detector_backend)
+                    fresh[path] = (mtime, vec)
+                    if vec is None:
+                        continue
+
+                    identities.append(path)
+                    student_ids.append(student_id)
+                    names.append(name)
+                    vectors.append(vec)
+
+        self._save_cache(fresh)
+
+        embeddings = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        course_rows = {}
+        student_rows = {}
+        for i, student_id in enumerate(student_ids):
+            student_rows.setdefault(student_id, []).append(i)
+            course = courses.get(student_id)
+            if course:
+                course_rows.setdefault(course, []).append(i)
+        partitions = {}
+        for course, rows in course_rows.items():
+            rows = np.array(rows, dtype=np.int64)
+            partitions[course] = (rows, embeddings[rows])
+
+        with self._lock:
+            self.identities = identities
+            self.student_ids = student_ids
+            self.names = names
+            self.embeddings = embeddings
+            self.partitions = partitions
+            self.student_rows = student_rows
+
+        print(f"[INFO] Gallery ({self.model_name}) indexed {len(identities)} images in {len(partitions)} courses")
+        return self
+
+    def search(self, embedding: np.ndarray, top_k: int = 5, student_ids=None, courses=None):
+        """
+        Return up to top_k closest students as dicts sorted by cosine distance.
+
+        Each student appears once, with the distance of their closest image.
+        When student_ids is given, only those students' images are compared;
+        otherwise when courses is given, only those course partitions are scanned.
+        """
+        with self._lock:
+            if embedding is None or len(self.identities) == 0:
+                return []
+
+            if student_ids is not None:
+                rows = [i for sid in student_ids for i in self.student_rows.get(sid, [])]
+                if not rows:
+                    return []
+                rows = np.array(rows, dtype=np.int64)
+                matrix = self.embeddings[rows]
+            elif courses is not None:
+                parts = [self.partitions[c] for c in courses if c in self.partitions]
+                if not parts:
+                    return []
+                if len(parts) == 1:
+                    rows, matrix = parts[0]
+                else:
+                    rows = np.concatenate([p[0] for p in parts])
+                    matrix = np.vstack([p[1] for p in parts])
+            else:
+                rows, matrix = np.arange(len(self.identities)), self.embeddings
+
+            distances = 1.0 - matrix @ embedding
+
+            results = []
+            seen = set()
+            for j in np.argsort(distances):
+                i = rows[j]
+                student_id = self.student_ids[i]
+                if student_id in seen:
+                    continue
+                seen.add(student_id)
+                results.append({
+                    "identity": self.identities[i],
+                    "student_id": student_id,
+                    "name": self.names[i],
+                    "distance": float(distances[j]),
+                })
+                if len(results) >= top_k:
+                    break
+            return results
+
+
+# Example usage
+if __name__ == "__main__":
+    index = GalleryIndex().build()
+    probe = input("Enter path of a probe image: ")
+    for match in index.search(embed_image(probe)):
+        print(f"[INFO] {match['student_id']} | {match['name']} | distance={match['distance']:.4f}")
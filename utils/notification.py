@@ -9,11 +9,22 @@ from datetime import datetime
 # ============ CONFIG ============
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
-SENDER_EMAIL = st.secrets["EMAIL_ADDRESS"]      
-SENDER_PASSWORD = st.secrets["EMAIL_APP_PASSWORD"] 
 # ================================
 
 
+def get_smtp_credentials():
+    """
+    Return (sender_email, app_password), read when first needed.
+
+    Uses Streamlit secrets when available, otherwise the EMAIL_ADDRESS and
+    EMAIL_APP_PASSWORD environment variables (e.g. for the headless gate server).
+    """
+    try:
+        return st.secrets["EMAIL_ADDRESS"], st.secrets["EMAIL_APP_PASSWORD"]
+    except Exception:
+        return os.environ.get("EMAIL_ADDRESS"), os.environ.get("EMAIL_APP_PASSWORD")
+
+
 def send_email(receiver_email, subject, message, html=False):
     """
     Send an email notification.
@@ -25,9 +36,14 @@ def send_email(receiver_email, subject, message, html=False):
         html (bool): If True, send HTML email
     """
     try:
+        sender_email, sender_password = get_smtp_credentials()
+        if not sender_email or not sender_password:
+            print(f"[ERROR] Email not configured; skipping message to {receiver_email}")
+            return
+
         # Create message
         msg = MIMEMultipart()
-        msg["From"] = SENDER_EMAIL
+        msg["From"] = sender_email
         msg["To"] = receiver_email
         msg["Subject"] = subject
 
@@ -39,8 +55,8 @@ def send_email(receiver_email, subject, message, html=False):
         # Connect to mail server
         server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
         server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.sendmail(SENDER_EMAIL, receiver_email, msg.as_string())
+        server.login(sender_email, sender_password)
+        server.sendmail(sender_email, receiver_email, msg.as_string())
         server.quit()
 
         print(f"[INFO] Email sent successfully to {receiver_email}")
@@ -94,4 +110,4 @@ def notify_student_on_login(student_id, student_name):
     <br>
     <p>Best Regards,<br>Student Attendance System</p>
     """
-    send_email(st.secrets["EMAIL_ADDRESS"], subject, message, html=True)
+    send_email(get_smtp_credentials()[0], subject, message, html=True)
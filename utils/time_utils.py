@@ -2,6 +2,8 @@
 
 from datetime import datetime, timedelta
 
+from database.db_handler import get_last_status_today
+
 
 def get_current_time():
     """
@@ -54,6 +56,41 @@ def format_duration(minutes: int):
     return f"{hours}h {mins}m"
 
 
+def determine_status(student_id: str):
+    """
+    Decide whether a recognition is a login or a logout.
+
+    The first scan of the day is a login; after that scans alternate based on
+    the student's last attendance row for today.
+    """
+    return "logout" if get_last_status_today(student_id) == "login" else "login"
+
+
+# Timetable used to narrow face search to the courses expected at a given time.
+# Keys are weekdays (0 = Monday); each slot is (start "HH:MM", end "HH:MM", [courses]).
+TIMETABLE = {
+    # 0: [("08:00", "10:00", ["BCSY1S2"]), ("10:00", "12:00", ["BCSY2S1", "BITY2S1"])],
+}
+
+
+def get_slot_courses(when: datetime = None, timetable: dict = None):
+    """
+    Return the list of courses scheduled at a given time, or None if no slot matches.
+
+    Args:
+        when (datetime): Time to look up (default now)
+        timetable (dict): Overrides TIMETABLE
+    """
+    when = when or datetime.now()
+    timetable = TIMETABLE if timetable is None else timetable
+    current = when.strftime("%H:%M")
+    courses = []
+    for start, end, slot_courses in timetable.get(when.weekday(), []):
+        if start <= current < end:
+            courses.extend(slot_courses)
+    return courses or None
+
+
 # Example usage
 if __name__ == "__main__":
     now = get_current_time()
@@ -65,3 +102,4 @@ if __name__ == "__main__":
 
     print("[INFO] Duration:", format_duration(calculate_duration(login, logout)))
     print("[INFO] Was Late?:", is_late(login))
+    print("[INFO] Courses in current slot:", get_slot_courses())